@@ -42,10 +42,11 @@ class AIEngine:
                 continue
         raise Exception("All models failed.")
 
-    def analyze_transcription_with_timestamps(self, segments, max_duration=15):
+    def analyze_transcription_with_timestamps(self, segments, max_duration=15, fallback=True):
         """
         segments: list of dicts from Whisper {'start': 0.0, 'end': 1.0, 'text': '...'}
         max_duration: maximum duration of a clip in seconds
+        fallback: if False, Gemini errors are raised instead of returning a placeholder clip
         """
         # Prepare a condensed version
         context_str = ""
@@ -78,6 +79,8 @@ class AIEngine:
             return json.loads(text)
         except Exception as e:
             print(f"Error in Gemini analysis: {e}")
+            if not fallback:
+                raise
             # Fallback dummy data if API fails
             return [
                 {"start_time": 0, "end_time": 10, "viral_score": 5, "summary": "Error in AI generation - Fallback", "hashtags": "#error"}
@@ -24,6 +24,8 @@ except Exception as e:
 
 # Import our modules
 import utils
+import encoder
+import workspace
 from ai_engine import AIEngine
 from video_processor import process_video
 
@@ -140,6 +142,8 @@ with col_upload:
     
     use_subs = st.checkbox("Embed English Subtitles", value=True)
     duration = st.slider("Max Clip Duration (seconds)", 10, 60, 15)
+    profiles = list(encoder.ENCODER_PROFILES)
+    encoder_profile = st.selectbox("Encoder Profile", profiles, index=profiles.index(encoder.DEFAULT_PROFILE))
     
     if st.button("🚀 Launch Processing Engine", use_container_width=True):
         st.session_state['processing_active'] = True
@@ -169,8 +173,26 @@ if st.session_state.get('processing_active') and st.session_state.get('current_f
                     status_text.markdown(f"**Status:** {msg}")
                     progress_bar.progress(prog)
 
-                update_status("Ingesting media...", 10)
-                temp_path = utils.save_uploaded_file(uploaded_file)
+                # Workspace: previous results of this session become evictable, new job gets its own dir
+                ws = workspace.get_workspace()
+                if st.session_state.get('job_id'):
+                    ws.release(st.session_state.pop('job_id'))
+                    st.session_state['generated_clips'] = []
+
+                temp_path = None
+                update_status("Checking disk space...", 5)
+                job_id = ws.create_job(needed_bytes=uploaded_file.size * workspace.JOB_SIZE_FACTOR, timeout=60)
+                if not job_id:
+                    st.error("Not enough disk space to start a new job. Please try again later.")
+                    st.session_state['processing_active'] = False
+                else:
+                    st.session_state['job_id'] = job_id
+                    update_status("Ingesting media...", 10)
+                    temp_path = utils.save_uploaded_file(uploaded_file, directory=ws.job_dir(job_id))
+                    if not temp_path:
+                        st.error("Could not save the uploaded file.")
+                        ws.release(st.session_state.pop('job_id'), delete=True)
+                        st.session_state['processing_active'] = False
                 
                 if temp_path:
                     try:
@@ -178,6 +200,7 @@ if st.session_state.get('processing_active') and st.session_state.get('current_f
                         api_key = config.get("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
                         if not api_key:
                             st.error("API Key missing! Check Sidebar.")
+                            ws.release(st.session_state.pop('job_id'), delete=True)
                             st.session_state['processing_active'] = False # Stop
                         else:
                             engine = AIEngine(gemini_api_key=api_key)
@@ -205,11 +228,16 @@ if st.session_state.get('processing_active') and st.session_state.get('current_f
                                 temp_path, 
                                 clips_metadata, 
                                 transcript_segments=transcript_segments, 
+                                output_dir=os.path.join(ws.job_dir(job_id), "clips"),
                                 use_subs=use_subs,
                                 max_clip_duration=duration,
-                                crop_mode="Letterbox"
+                                crop_mode="Letterbox",
+                                encoder_profile=encoder_profile
                             )
                             
+                            # Clips are on disk now; hand back the space reservation
+                            ws.finish_writes(job_id)
+                            
                             # Context
                             st.session_state['generated_clips'] = generated_paths
                             st.session_state['clips_metadata'] = clips_metadata
@@ -223,8 +251,16 @@ if st.session_state.get('processing_active') and st.session_state.get('current_f
                     except Exception as e:
                         st.error(f"Processing Error: {e}")
                         utils.cleanup_temp_files([temp_path])
+                        ws.release(st.session_state.pop('job_id'), delete=True)
                         st.session_state['processing_active'] = False
 
+# Keep this session's job lease alive while its clips are on screen
+if st.session_state.get('job_id'):
+    if not workspace.get_workspace().renew(st.session_state['job_id']):
+        # Lease expired (session idle too long) and the job was evicted; its clips are gone
+        st.session_state.pop('job_id')
+        st.session_state['generated_clips'] = []
+
 # --- Render Persistent Logs (Outside Processing Loop) ---
 # This ensures they stay visible even after 'processing_active' becomes False
 with col_preview:
@@ -0,0 +1,367 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import queue
+import threading
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+import utils
+import encoder
+import workspace
+from ai_engine import AIEngine
+from video_processor import process_video
+
+load_dotenv()
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".mkv", ".avi", ".webm", ".m4v")
+MANIFEST_NAME = "manifest.json"
+TRANSCRIPT_NAME = "transcript.json"
+
+
+def collect_videos(source):
+    """
+    Returns the list of video paths to process.
+    source: a directory (scanned for video files), a .json manifest
+    (list of paths or of {"path": ...} dicts) or a text file with one path per line.
+    """
+    if os.path.isdir(source):
+        videos = []
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(VIDEO_EXTENSIONS):
+                videos.append(os.path.join(source, name))
+        return videos
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, "r") as f:
+        if source.lower().endswith(".json"):
+            entries = json.load(f)
+            paths = [e["path"] if isinstance(e, dict) else e for e in entries]
+        else:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    # Relative entries are resolved against the manifest's own directory
+    return [p if os.path.isabs(p) else os.path.join(base_dir, p) for p in paths]
+
+
+def video_key(video_path):
+    """Stable, filesystem-safe identifier for a video (name + short path hash)."""
+    abs_path = os.path.abspath(video_path)
+    stem = os.path.splitext(os.path.basename(abs_path))[0]
+    digest = hashlib.sha1(abs_path.encode("utf-8")).hexdigest()[:8]
+    return f"{stem}_{digest}"
+
+
+def load_manifest(path):
+    """Loads a results manifest, or returns an empty one."""
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Could not read manifest {path}: {e}. Starting fresh.")
+    return {"videos": {}}
+
+
+def save_manifest(manifest, path):
+    """Writes the manifest atomically so an interrupted run never leaves it half-written."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _is_done(entry):
+    """True if a manifest entry finished and all its clips are still on disk."""
+    if not entry or entry.get("status") != "done":
+        return False
+    return all(os.path.exists(c["path"]) for c in entry.get("clips", []))
+
+
+def _load_transcript(job_dir):
+    path = os.path.join(job_dir, TRANSCRIPT_NAME)
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception:
+            return None
+    return None
+
+
+def _save_transcript(job_dir, segments):
+    # Keep only what analysis and subtitles need; Whisper's token lists are large
+    slim = [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in segments]
+    with open(os.path.join(job_dir, TRANSCRIPT_NAME), "w") as f:
+        json.dump(slim, f)
+    return slim
+
+
+class _DaemonPool:
+    """
+    Minimal executor whose workers are daemon threads.
+    ThreadPoolExecutor joins its threads at interpreter exit, so Ctrl-C would still
+    wait for Whisper / ffmpeg to finish; these workers are simply abandoned instead.
+    """
+
+    def __init__(self, max_workers, name):
+        self._queue = queue.Queue()
+        self._workers = max(1, max_workers)
+        for i in range(self._workers):
+            threading.Thread(target=self._work, name=f"{name}_{i}", daemon=True).start()
+
+    def submit(self, fn, *args):
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, cancel_futures=False):
+        """Stops the workers once idle; queued jobs are cancelled if cancel_futures is set."""
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        for _ in range(self._workers):
+            self._queue.put(None)
+
+
+def run_batch(source, output_dir="batch_output", gemini_api_key=None, max_clip_duration=15,
+              use_subs=True, crop_mode="Letterbox", task="translate", render_workers=2, resume=True,
+              encoder_profile=encoder.DEFAULT_PROFILE, encode_budget=None,
+              min_free_bytes=workspace.DEFAULT_MIN_FREE_BYTES, space_timeout=600):
+    """
+    Headless pipeline over many videos.
+    Transcription (Whisper) runs on a single-worker pool since the model is shared,
+    while analysis + rendering run on a separate pool of `render_workers`, so the
+    next video is transcribed while earlier ones render.
+    Progress is checkpointed to <output_dir>/manifest.json; with resume=True finished
+    videos are skipped and already-transcribed ones go straight to rendering.
+    encoder_profile / encode_budget are passed to process_video (see encoder.py).
+    Each render reserves its estimated output size once the disk has room for it plus
+    min_free_bytes (waiting up to space_timeout seconds); otherwise the video is marked
+    failed and retried on resume.
+    Raises ValueError if no Gemini API key is configured.
+    Returns the manifest dict.
+    """
+    api_key = gemini_api_key or utils.load_config().get("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("Gemini API key missing. Pass --api-key, set GEMINI_API_KEY or save it in the app.")
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path) if resume else {"videos": {}}
+    lock = threading.Lock()
+    # Set on interrupt: abandoned workers keep running but must not touch the manifest any more
+    stopped = threading.Event()
+
+    def update(key, **fields):
+        with lock:
+            if stopped.is_set():
+                return
+            manifest["videos"].setdefault(key, {}).update(fields)
+            save_manifest(manifest, manifest_path)
+
+    def set_timing(key, stage, seconds):
+        with lock:
+            if stopped.is_set():
+                return
+            manifest["videos"][key].setdefault("timings", {})[stage] = round(seconds, 2)
+            save_manifest(manifest, manifest_path)
+
+    videos = collect_videos(source)
+    pending = []
+    seen = set()
+    for video_path in videos:
+        # Absolute paths keep the manifest valid when resuming from another directory
+        video_path = os.path.abspath(video_path)
+        key = video_key(video_path)
+        if key in seen:
+            continue
+        seen.add(key)
+        job_dir = os.path.abspath(os.path.join(output_dir, key))
+        if resume and _is_done(manifest["videos"].get(key)):
+            print(f"[skip] {video_path} (already processed)")
+            continue
+        if not os.path.exists(video_path):
+            update(key, source=video_path, status="failed", error="File not found")
+            continue
+        os.makedirs(job_dir, exist_ok=True)
+        update(key, source=video_path, output_dir=job_dir, status="pending", error=None)
+        pending.append((key, video_path, job_dir))
+
+    if not pending:
+        print("Nothing to process.")
+        return manifest
+
+    engine = AIEngine(gemini_api_key=api_key)
+
+    def transcribe_job(key, video_path, job_dir):
+        update(key, status="transcribing")
+        t0 = time.time()
+        result = engine.transcribe_video(video_path, task=task)
+        if not result:
+            raise RuntimeError("Transcription failed")
+        segments = _save_transcript(job_dir, result["segments"])
+        set_timing(key, "transcribe", time.time() - t0)
+        update(key, status="transcribed")
+        return segments
+
+    def render_job(key, video_path, job_dir, segments):
+        update(key, status="waiting_for_disk")
+        needed = workspace.estimate_job_bytes(video_path)
+        if not workspace.wait_for_free_space(job_dir, needed, min_free_bytes=min_free_bytes, timeout=space_timeout):
+            raise RuntimeError("Not enough free disk space")
+        try:
+            return _analyze_and_render(key, video_path, job_dir, segments)
+        finally:
+            workspace.release_space(needed)
+
+    def _analyze_and_render(key, video_path, job_dir, segments):
+        update(key, status="analyzing")
+        t0 = time.time()
+        # No placeholder clip on Gemini errors: fail the video so resume retries it
+        clips_metadata = engine.analyze_transcription_with_timestamps(segments, max_duration=max_clip_duration, fallback=False)
+        set_timing(key, "analyze", time.time() - t0)
+
+        update(key, status="rendering")
+        t0 = time.time()
+        generated = process_video(
+            video_path,
+            clips_metadata,
+            transcript_segments=segments,
+            output_dir=job_dir,
+            use_subs=use_subs,
+            max_clip_duration=max_clip_duration,
+            crop_mode=crop_mode,
+            encoder_profile=encoder_profile,
+            encode_budget=encode_budget,
+            concurrent_jobs=render_workers
+        )
+        set_timing(key, "render", time.time() - t0)
+        if clips_metadata and not generated:
+            raise RuntimeError("Rendering produced no clips")
+
+        # process_video names files clip_<i+1>_<int(start)>.mp4; use that to pair clips with metadata
+        by_name = {os.path.basename(p): p for p in generated}
+        clips = []
+        for i, meta in enumerate(clips_metadata):
+            if meta.get("start_time") is None or meta.get("end_time") is None:
+                continue
+            path = by_name.get(f"clip_{i+1}_{int(meta['start_time'])}.mp4")
+            if path:
+                clips.append({
+                    "path": path,
+                    "start_time": meta.get("start_time"),
+                    "end_time": meta.get("end_time"),
+                    "viral_score": meta.get("viral_score"),
+                    "summary": meta.get("summary"),
+                    "hashtags": meta.get("hashtags"),
+                })
+        update(key, status="done", clips=clips)
+        return clips
+
+    transcribe_pool = _DaemonPool(1, "transcribe")
+    render_pool = _DaemonPool(render_workers, "render")
+    futures = {}
+    interrupted = False
+
+    try:
+        for key, video_path, job_dir in pending:
+            segments = _load_transcript(job_dir) if resume else None
+            if segments is not None:
+                futures[render_pool.submit(render_job, key, video_path, job_dir, segments)] = ("render", key, video_path, job_dir)
+            else:
+                futures[transcribe_pool.submit(transcribe_job, key, video_path, job_dir)] = ("transcribe", key, video_path, job_dir)
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, key, video_path, job_dir = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"[failed] {video_path} during {stage}: {e}")
+                    update(key, status="failed", error=str(e))
+                    continue
+                if stage == "transcribe":
+                    futures[render_pool.submit(render_job, key, video_path, job_dir, result)] = ("render", key, video_path, job_dir)
+                else:
+                    print(f"[done] {video_path}: {len(result)} clips")
+    except KeyboardInterrupt:
+        interrupted = True
+        # In-flight work is abandoned; put it back so the next run picks it up
+        for _, key, _, _ in futures.values():
+            update(key, status="pending")
+        stopped.set()
+        print("Interrupted. Progress is saved; rerun the same command to resume.")
+        raise
+    finally:
+        transcribe_pool.shutdown(cancel_futures=interrupted)
+        render_pool.shutdown(cancel_futures=interrupted)
+
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PulsePoint AI batch mode: generate clips for many videos headlessly.")
+    parser.add_argument("source", help="Directory of videos, .json manifest, or text file with one path per line")
+    parser.add_argument("-o", "--output-dir", default="batch_output", help="Where clips and manifest.json are written")
+    parser.add_argument("--api-key", default=None, help="Gemini API key (defaults to config.json / GEMINI_API_KEY)")
+    parser.add_argument("--duration", type=int, default=15, help="Max clip duration in seconds")
+    parser.add_argument("--no-subs", action="store_true", help="Do not burn subtitles")
+    parser.add_argument("--crop-mode", default="Letterbox", choices=["Letterbox", "Face Tracking"])
+    parser.add_argument("--task", default="translate", choices=["transcribe", "translate"], help="Whisper task")
+    parser.add_argument("--render-workers", type=int, default=2, help="Number of videos rendered in parallel")
+    parser.add_argument("--encoder-profile", default=encoder.DEFAULT_PROFILE, choices=list(encoder.ENCODER_PROFILES))
+    parser.add_argument("--encode-budget", type=float, default=None, help="Target encode time per clip in seconds")
+    parser.add_argument("--min-free-gb", type=float, default=workspace.DEFAULT_MIN_FREE_BYTES / workspace.GB,
+                        help="Hold back renders until this much disk space would remain free")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore an existing manifest and reprocess everything")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = run_batch(
+            args.source,
+            output_dir=args.output_dir,
+            gemini_api_key=args.api_key,
+            max_clip_duration=args.duration,
+            use_subs=not args.no_subs,
+            crop_mode=args.crop_mode,
+            task=args.task,
+            render_workers=args.render_workers,
+            resume=not args.no_resume,
+            encoder_profile=args.encoder_profile,
+            encode_budget=args.encode_budget,
+            min_free_bytes=int(args.min_free_gb * workspace.GB)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    failed = [v for v in manifest["videos"].values() if v.get("status") == "failed"]
+    print(f"Finished: {len(manifest['videos']) - len(failed)} ok, {len(failed)} failed. "
+          f"Manifest: {os.path.join(args.output_dir, MANIFEST_NAME)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
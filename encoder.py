@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+STATS_FILE = "encoder_stats.json"
+MAX_STATS_PER_PRESET = 50
+STATS_LOCK_TIMEOUT = 10  # seconds to wait for another process to finish updating the stats
+STATS_LOCK_STALE = 30    # a lock file older than this was left by a crashed process
+
+# libx264 presets from fastest to slowest
+PRESET_ORDER = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+
+# min_preset: fastest preset an encode budget may push the profile to
+ENCODER_PROFILES = {
+    "fast-preview": {"preset": "ultrafast", "min_preset": "ultrafast", "crf": 30, "audio_bitrate": "96k"},
+    "balanced": {"preset": "veryfast", "min_preset": "ultrafast", "crf": 23, "audio_bitrate": "128k"},
+    "archive": {"preset": "slow", "min_preset": "veryfast", "crf": 18, "audio_bitrate": "192k"},
+}
+DEFAULT_PROFILE = "balanced"
+
+# Faster presets compress worse at the same CRF; raise CRF per step so file size stays roughly flat
+CRF_STEP_PER_PRESET = 1
+MAX_CRF = 30
+
+# Rough per-thread render fps for a 1080x1920 clip, used until real measurements exist
+DEFAULT_FPS_PER_THREAD = {
+    "ultrafast": 40, "superfast": 30, "veryfast": 20, "faster": 14, "fast": 11,
+    "medium": 8, "slow": 4, "slower": 2, "veryslow": 1,
+}
+
+# Serializes threads in this process; _stats_file_lock() covers other processes
+_stats_lock = threading.Lock()
+
+
+def available_cores():
+    """Number of CPU cores this process may actually use."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def pick_threads(concurrent_jobs=1):
+    """Splits the available cores between encodes running at the same time."""
+    return max(1, available_cores() // max(1, concurrent_jobs))
+
+
+def load_stats():
+    """Loads recorded measurements ({preset: [{"fps": ..., "context": {...}, ...}, ...]})."""
+    if os.path.exists(STATS_FILE):
+        try:
+            with open(STATS_FILE, "r") as f:
+                return json.load(f)
+        except:
+            return {}
+    return {}
+
+
+@contextmanager
+def _stats_file_lock():
+    """
+    Cross-process lock around the stats read-modify-write (the app and batch runs may
+    share the file). Uses an O_EXCL lock file so it works on Windows too.
+    """
+    lock_path = STATS_FILE + ".lock"
+    deadline = time.time() + STATS_LOCK_TIMEOUT
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STATS_LOCK_STALE:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.time() >= deadline:
+                raise TimeoutError(f"Timed out waiting for {lock_path}")
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+def _save_stats(stats):
+    # Atomic write so lock-free readers (load_stats) never see a partial file
+    tmp_path = f"{STATS_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(stats, f, indent=2)
+    os.replace(tmp_path, STATS_FILE)
+
+
+def record_encode(settings, frames, seconds):
+    """
+    Appends the achieved fps for these settings to the stats file.
+    Note: `seconds` covers the whole write_videofile call, so this is the end-to-end
+    render rate (MoviePy frame generation: resize, face-tracking crop, subtitle
+    burn-in, plus the x264 encode), not x264 speed alone. Samples are therefore
+    tagged with settings["context"] (crop mode, subtitles, resolution) and only
+    compared with samples from the same context.
+    """
+    if not frames or seconds <= 0:
+        return None
+    fps = frames / seconds
+    entry = {
+        "profile": settings["profile"],
+        "crf": settings["crf"],
+        "threads": settings["threads"],
+        "context": settings.get("context"),
+        "frames": int(frames),
+        "seconds": round(seconds, 2),
+        "fps": round(fps, 2),
+        "timestamp": int(time.time()),
+    }
+    with _stats_lock:
+        try:
+            with _stats_file_lock():
+                stats = load_stats()
+                history = stats.setdefault(settings["preset"], [])
+                history.append(entry)
+                stats[settings["preset"]] = history[-MAX_STATS_PER_PRESET:]
+                _save_stats(stats)
+        except Exception as e:
+            print(f"Error saving encoder stats: {e}")
+    return fps
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def expected_fps(preset, threads, context=None, stats=None):
+    """
+    Predicted render fps for a preset in a given context.
+    Uses the median of samples with the same context and thread count; with only
+    other thread counts available it scales linearly (an optimistic approximation),
+    and with no matching samples it falls back to the built-in estimate.
+    """
+    stats = load_stats() if stats is None else stats
+    samples = [e for e in stats.get(preset, []) if e.get("context") == context]
+    same_threads = [e["fps"] for e in samples if e["threads"] == threads]
+    if same_threads:
+        return _median(same_threads)
+    if samples:
+        return _median(e["fps"] / e["threads"] for e in samples) * threads
+    return DEFAULT_FPS_PER_THREAD[preset] * threads
+
+
+def select_encoder_settings(profile=DEFAULT_PROFILE, frames=None, time_budget=None, concurrent_jobs=1, context=None):
+    """
+    Picks libx264 preset, CRF and thread count for one encode.
+    profile: one of ENCODER_PROFILES ("fast-preview", "balanced", "archive")
+    frames / time_budget: if both are given, the preset is stepped towards faster presets
+    (no further than the profile's min_preset) until the predicted time fits the budget
+    in seconds; CRF rises by CRF_STEP_PER_PRESET per step to keep file size in check.
+    context: dict describing the render (crop mode, subtitles, resolution) used to match stats.
+    """
+    if profile not in ENCODER_PROFILES:
+        print(f"Unknown encoder profile '{profile}', using '{DEFAULT_PROFILE}'.")
+        profile = DEFAULT_PROFILE
+
+    settings = dict(ENCODER_PROFILES[profile])
+    settings["profile"] = profile
+    settings["threads"] = pick_threads(concurrent_jobs)
+    settings["context"] = context
+
+    if frames and time_budget:
+        stats = load_stats()
+        start = PRESET_ORDER.index(settings["preset"])
+        floor = PRESET_ORDER.index(settings["min_preset"])
+        idx = start
+        while idx > floor and frames / expected_fps(PRESET_ORDER[idx], settings["threads"], context, stats) > time_budget:
+            idx -= 1
+        settings["preset"] = PRESET_ORDER[idx]
+        settings["crf"] = min(MAX_CRF, settings["crf"] + (start - idx) * CRF_STEP_PER_PRESET)
+
+    return settings
+
+
+def write_videofile_kwargs(settings):
+    """Translates encoder settings into keyword arguments for MoviePy's write_videofile."""
+    return {
+        "codec": "libx264",
+        "audio_codec": "aac",
+        "preset": settings["preset"],
+        "threads": settings["threads"],
+        "audio_bitrate": settings["audio_bitrate"],
+        "ffmpeg_params": ["-crf", str(settings["crf"])],
+    }
@@ -0,0 +1,55 @@
+import multiprocessing
+
+import pytest
+
+import encoder
+
+CONTEXT = {"crop_mode": "Letterbox", "use_subs": True, "resolution": "1080x1920"}
+
+
+@pytest.fixture(autouse=True)
+def stats_in_tmp(tmp_path, monkeypatch):
+    # STATS_FILE is relative to the cwd
+    monkeypatch.chdir(tmp_path)
+
+
+def test_budget_steps_preset_and_raises_crf():
+    settings = encoder.select_encoder_settings("archive", frames=900, time_budget=5)
+    # archive never goes faster than its min_preset; CRF rises one step per preset
+    assert settings["preset"] == "veryfast"
+    assert settings["crf"] == 18 + 4
+
+
+def test_crf_is_capped():
+    settings = encoder.select_encoder_settings("balanced", frames=10 ** 6, time_budget=0.1)
+    assert settings["preset"] == "ultrafast"
+    assert settings["crf"] <= encoder.MAX_CRF
+
+
+def test_no_budget_keeps_profile():
+    settings = encoder.select_encoder_settings("archive")
+    assert (settings["preset"], settings["crf"]) == ("slow", 18)
+
+
+def test_expected_fps_only_uses_matching_context():
+    settings = encoder.select_encoder_settings("balanced", context=CONTEXT)
+    encoder.record_encode(settings, frames=300, seconds=10)
+    threads = settings["threads"]
+    assert encoder.expected_fps("veryfast", threads, CONTEXT) == 30
+    assert encoder.expected_fps("veryfast", threads, None) == encoder.DEFAULT_FPS_PER_THREAD["veryfast"] * threads
+
+
+def _record_many(n):
+    settings = encoder.select_encoder_settings("balanced", context=CONTEXT)
+    for _ in range(n):
+        encoder.record_encode(settings, frames=100, seconds=1)
+
+
+def test_concurrent_processes_do_not_lose_samples():
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_record_many, args=(20,)) for _ in range(2)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert len(encoder.load_stats()["veryfast"]) == 40
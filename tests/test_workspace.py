@@ -0,0 +1,127 @@
+import os
+import time
+
+import pytest
+
+import workspace
+
+
+def _fill(ws, job_id, nbytes):
+    with open(os.path.join(ws.job_dir(job_id), "clip.mp4"), "wb") as f:
+        f.write(b"x" * nbytes)
+
+
+def _age(ws, job_id, seconds):
+    old = time.time() - seconds
+    os.utime(ws.job_dir(job_id), (old, old))
+
+
+@pytest.fixture
+def ws(tmp_path):
+    return workspace.Workspace(root=str(tmp_path / "ws"), quota_bytes=1000, max_age_seconds=3600, min_free_bytes=0)
+
+
+@pytest.fixture(autouse=True)
+def no_leaked_reservations():
+    yield
+    workspace._reserved_bytes = 0
+
+
+def test_released_job_is_evicted_to_admit_new_job(ws):
+    old = ws.create_job(timeout=0)
+    _fill(ws, old, 600)
+    ws.release(old)
+
+    new = ws.create_job(needed_bytes=500, timeout=0)
+
+    assert new is not None
+    assert not os.path.exists(ws.job_dir(old))
+
+
+def test_held_job_is_not_evicted_for_quota(ws):
+    held = ws.create_job(timeout=0)
+    _fill(ws, held, 600)
+    ws.finish_writes(held)
+
+    assert ws.create_job(needed_bytes=500, timeout=0) is None
+    assert os.path.exists(ws.job_dir(held))
+
+
+def test_evicts_oldest_released_first_and_only_as_needed(ws):
+    jobs = []
+    for age in (300, 200, 100):
+        job_id = ws.create_job(timeout=0)
+        _fill(ws, job_id, 300)
+        ws.release(job_id)
+        _age(ws, job_id, age)
+        jobs.append(job_id)
+
+    assert ws.create_job(needed_bytes=200, timeout=0) is not None
+    assert [os.path.exists(ws.job_dir(j)) for j in jobs] == [False, True, True]
+
+
+def test_low_disk_space_triggers_eviction(ws, monkeypatch):
+    ws.quota_bytes = 10 ** 9
+    ws.min_free_bytes = 100
+    disk = 1000
+    monkeypatch.setattr(workspace, "free_bytes", lambda path: disk - ws.usage_bytes())
+
+    old = ws.create_job(timeout=0)
+    _fill(ws, old, 700)
+    ws.release(old)
+
+    assert ws.create_job(needed_bytes=500, timeout=0) is not None
+    assert not os.path.exists(ws.job_dir(old))
+
+
+def test_expired_lease_is_evicted_and_renew_reports_it(ws):
+    job_id = ws.create_job(timeout=0)
+    _age(ws, job_id, 7200)
+
+    assert ws.evict() == [job_id]
+    assert ws.renew(job_id) is False
+
+
+def test_renewed_lease_survives(ws):
+    job_id = ws.create_job(timeout=0)
+    _age(ws, job_id, 7200)
+    assert ws.renew(job_id) is True
+    assert ws.evict() == []
+
+
+def test_reservation_blocks_concurrent_admission(ws):
+    first = ws.create_job(needed_bytes=600, timeout=0)
+    assert first is not None
+    assert ws.create_job(needed_bytes=600, timeout=0) is None
+
+    ws.finish_writes(first)
+    assert ws.create_job(needed_bytes=600, timeout=0) is not None
+
+
+def test_job_created_during_listing_is_not_evicted(ws, monkeypatch):
+    ws.quota_bytes = 0  # over quota: any released job would be removed
+    real_listdir = os.listdir
+    created = []
+
+    def listdir_then_create(path):
+        names = real_listdir(path)
+        if not created:
+            # Another session admits a job right after the directory was listed
+            with ws._lock:
+                ws._held.add("job_new")
+            os.makedirs(ws.job_dir("job_new"))
+            created.append("job_new")
+            names.append("job_new")
+        return names
+
+    monkeypatch.setattr(os, "listdir", listdir_then_create)
+    assert "job_new" not in ws.evict()
+    assert os.path.exists(ws.job_dir("job_new"))
+
+
+def test_wait_for_free_space_reserves(tmp_path):
+    half = workspace.free_bytes(str(tmp_path)) // 2 + 1
+    assert workspace.wait_for_free_space(str(tmp_path), half, min_free_bytes=0, timeout=0)
+    assert not workspace.wait_for_free_space(str(tmp_path), half, min_free_bytes=0, timeout=0)
+    workspace.release_space(half)
+    assert workspace.wait_for_free_space(str(tmp_path), half, min_free_bytes=0, timeout=0)
@@ -4,10 +4,10 @@ import zipfile
 import tempfile
 import json
 
-def save_uploaded_file(uploaded_file):
-    """Saves uploaded file to a temporary directory."""
+def save_uploaded_file(uploaded_file, directory=None):
+    """Saves uploaded file to `directory` (e.g. a workspace job dir), or the system temp dir."""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
+        with tempfile.NamedTemporaryFile(delete=False, dir=directory, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
             tmp_file.write(uploaded_file.getvalue())
             return tmp_file.name
     except Exception as e:
@@ -1,4 +1,5 @@
 import os
+import time
 import cv2
 import numpy as np
 import mediapipe as mp
@@ -6,6 +7,8 @@ from PIL import Image, ImageDraw, ImageFont
 from moviepy.editor import VideoFileClip, TextClip, CompositeVideoClip, AudioFileClip
 from moviepy.video.io.VideoFileClip import VideoFileClip
 
+import encoder
+
 # Fix for some environments where mp.solutions is not loaded automatically
 try:
     from mediapipe.python import solutions as mp_solutions
@@ -195,11 +198,14 @@ def crop_to_vertical_with_face_tracking(clip):
         x2 = (w / 2) + (target_w / 2)
         return clip.crop(x1=x1, y1=0, x2=x2, y2=h)
 
-def process_video(video_path, clips_metadata, transcript_segments=None, output_dir="generated_clips", use_subs=True, max_clip_duration=60, crop_mode="Letterbox"):
+def process_video(video_path, clips_metadata, transcript_segments=None, output_dir="generated_clips", use_subs=True, max_clip_duration=60, crop_mode="Letterbox", encoder_profile=encoder.DEFAULT_PROFILE, encode_budget=None, concurrent_jobs=1):
     """
     Cuts, Formats (Letterbox/Crop), Enforces Duration, and Adds Subtitles.
     crop_mode: "Letterbox" (All visible) or "Face Tracking" (Zoomed)
     transcript_segments: list of dicts from Whisper {'start': float, 'end': float, 'text': str}
+    encoder_profile: "fast-preview", "balanced" or "archive" (see encoder.py)
+    encode_budget: optional target encode time per clip in seconds; picks a faster preset if needed
+    concurrent_jobs: number of process_video calls running at once, so cores are shared between them
     """
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
@@ -228,9 +234,12 @@ def process_video(video_path, clips_metadata, transcript_segments=None, output_d
             if crop_mode == "Face Tracking" and clip.w > clip.h:
                 # Zoom/Crop
                 clip = crop_to_vertical_with_face_tracking(clip)
+                applied_mode = "Face Tracking"
             else:
                 # Default: Fit to Screen / Letterbox (User Preference)
                 clip = resize_to_letterbox_vertical(clip)
+                applied_mode = "Letterbox"
+            subs_burned = False
             
             # 3. Burn Subtitles (Real Speech Sync)
             if use_subs:
@@ -263,9 +272,19 @@ def process_video(video_path, clips_metadata, transcript_segments=None, output_d
                 
                 if clip_subs:
                     clip = burn_subtitles(clip, clip_subs)
+                    subs_burned = True
 
             output_filename = os.path.join(output_dir, f"clip_{i+1}_{int(start)}.mp4")
-            clip.write_videofile(output_filename, codec="libx264", audio_codec="aac")
+            # Keep MoviePy's temp audio next to the output (it defaults to the cwd and leaks on failure)
+            temp_audiofile = os.path.join(output_dir, f"clip_{i+1}_{int(start)}_TEMP_audio.m4a")
+            # 4. Encode with hardware-aware settings and record the achieved render fps
+            # (measured over the whole write, so it includes frame generation; hence the context)
+            frames = clip.duration * (clip.fps or original_clip.fps)
+            context = {"crop_mode": applied_mode, "use_subs": subs_burned, "resolution": f"{clip.w}x{clip.h}"}
+            settings = encoder.select_encoder_settings(encoder_profile, frames=frames, time_budget=encode_budget, concurrent_jobs=concurrent_jobs, context=context)
+            t0 = time.time()
+            clip.write_videofile(output_filename, temp_audiofile=temp_audiofile, **encoder.write_videofile_kwargs(settings))
+            encoder.record_encode(settings, frames, time.time() - t0)
             generated_files.append(output_filename)
             
         original_clip.close()
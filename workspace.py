@@ -0,0 +1,225 @@
+import os
+import time
+import shutil
+import uuid
+import threading
+
+WORKSPACE_DIR = "workspace"
+
+GB = 1024 ** 3
+DEFAULT_QUOTA_BYTES = 10 * GB        # total size the workspace may grow to
+DEFAULT_MAX_AGE_SECONDS = 24 * 3600  # released jobs, and held jobs not renewed, older than this are evicted
+DEFAULT_MIN_FREE_BYTES = 2 * GB      # always keep this much free on the disk
+
+# Rendering writes the clips plus MoviePy's temp audio; budget a multiple of the source size
+JOB_SIZE_FACTOR = 2
+
+# Bytes that admitted jobs in this process still expect to write. Subtracted from the
+# free space in every check so concurrent jobs cannot all pass on the same reading.
+_reserve_lock = threading.Lock()
+_reserved_bytes = 0
+
+
+def dir_size(path):
+    """Total size in bytes of all files under path."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def free_bytes(path):
+    """Free disk space in bytes on the filesystem holding path."""
+    os.makedirs(path, exist_ok=True)
+    return shutil.disk_usage(path).free
+
+
+def estimate_job_bytes(video_path):
+    """Rough disk space a job needs, based on the source video size."""
+    try:
+        return os.path.getsize(video_path) * JOB_SIZE_FACTOR
+    except OSError:
+        return 0
+
+
+def _poll(check, timeout=None, poll_interval=5):
+    """Calls check() until it returns True (-> True) or `timeout` seconds pass (-> False)."""
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        if check():
+            return True
+        if deadline is not None and time.time() >= deadline:
+            return False
+        time.sleep(poll_interval)
+
+
+def try_reserve_space(path, needed_bytes, min_free_bytes=DEFAULT_MIN_FREE_BYTES):
+    """Reserves `needed_bytes` if they fit on path's disk while leaving `min_free_bytes` free."""
+    global _reserved_bytes
+    with _reserve_lock:
+        if free_bytes(path) - _reserved_bytes - needed_bytes < min_free_bytes:
+            return False
+        _reserved_bytes += needed_bytes
+        return True
+
+
+def release_space(nbytes):
+    """Returns a reservation made by try_reserve_space / wait_for_free_space."""
+    global _reserved_bytes
+    with _reserve_lock:
+        _reserved_bytes = max(0, _reserved_bytes - nbytes)
+
+
+def wait_for_free_space(path, needed_bytes, min_free_bytes=DEFAULT_MIN_FREE_BYTES, timeout=None, poll_interval=5):
+    """
+    Blocks until `needed_bytes` can be reserved on path's disk (see try_reserve_space).
+    Returns True once reserved (the caller must call release_space when done writing),
+    False if `timeout` seconds pass first.
+    """
+    return _poll(lambda: try_reserve_space(path, needed_bytes, min_free_bytes), timeout, poll_interval)
+
+
+class Workspace:
+    """
+    Per-job working directories with lease-based cleanup.
+    A job is held from create_job until release; a held job stays on disk as long as
+    it is renewed within max_age_seconds (renew), so a session that disappears without
+    releasing only blocks its space until the lease expires. Released jobs are evicted
+    once older than max_age_seconds, or oldest first whenever space is needed for the
+    quota or the disk. Directories left over from earlier runs count as released.
+    """
+
+    def __init__(self, root=WORKSPACE_DIR, quota_bytes=DEFAULT_QUOTA_BYTES,
+                 max_age_seconds=DEFAULT_MAX_AGE_SECONDS, min_free_bytes=DEFAULT_MIN_FREE_BYTES):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.max_age_seconds = max_age_seconds
+        self.min_free_bytes = min_free_bytes
+        self._held = set()
+        self._reserved = {}  # job_id -> bytes the job may still write
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def create_job(self, prefix="job", needed_bytes=0, timeout=None, poll_interval=5):
+        """
+        Pre-flight + create: evicts what it can and waits until a job needing `needed_bytes`
+        fits within the quota and leaves min_free_bytes on disk, reserves that space, and
+        creates the (held) job directory. Returns the job id, or None if `timeout` seconds pass first.
+        """
+        job_id = f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+        def admit():
+            self.evict(needed_bytes)
+            with self._lock:
+                if self.usage_bytes() + sum(self._reserved.values()) + needed_bytes > self.quota_bytes:
+                    return False
+                if not try_reserve_space(self.root, needed_bytes, self.min_free_bytes):
+                    return False
+                # Held before the directory exists, so evict() (which lists first) never sees it released
+                self._reserved[job_id] = needed_bytes
+                self._held.add(job_id)
+            return True
+
+        if not _poll(admit, timeout, poll_interval):
+            return None
+        os.makedirs(self.job_dir(job_id))
+        return job_id
+
+    def finish_writes(self, job_id):
+        """Returns the job's space reservation once it is done writing (its files now count as usage)."""
+        with self._lock:
+            nbytes = self._reserved.pop(job_id, 0)
+        release_space(nbytes)
+
+    def renew(self, job_id):
+        """Renews the job's lease so age-based eviction counts from now. Returns False if the job is gone."""
+        try:
+            os.utime(self.job_dir(job_id))
+            return True
+        except OSError:
+            return False
+
+    def release(self, job_id, delete=False):
+        """Stops holding the job (no-op if not held). With delete=True its directory is removed now."""
+        with self._lock:
+            self._held.discard(job_id)
+        self.finish_writes(job_id)
+        if delete:
+            self._remove(job_id)
+
+    def _remove(self, job_id):
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def _evictable_jobs(self):
+        """(mtime, job_id, size, held) for released jobs and expired leases, oldest first."""
+        now = time.time()
+        names = os.listdir(self.root)
+        # Snapshot after listing: a job created in between is already in _held
+        with self._lock:
+            held = set(self._held)
+        jobs = []
+        for job_id in names:
+            path = self.job_dir(job_id)
+            if not os.path.isdir(path):
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if job_id in held and now - mtime <= self.max_age_seconds:
+                continue
+            jobs.append((mtime, job_id, dir_size(path), job_id in held))
+        return sorted(jobs)
+
+    def usage_bytes(self):
+        return dir_size(self.root)
+
+    def _fits(self, usage, needed_bytes):
+        """True if `needed_bytes` more fit in both the quota and the disk, counting reservations."""
+        with self._lock:
+            reserved = sum(self._reserved.values())
+        if usage + reserved + needed_bytes > self.quota_bytes:
+            return False
+        with _reserve_lock:
+            return free_bytes(self.root) - _reserved_bytes - needed_bytes >= self.min_free_bytes
+
+    def evict(self, needed_bytes=0):
+        """
+        Removes expired leases and released jobs older than max_age_seconds, then released
+        jobs oldest first until `needed_bytes` more fit in the quota and on the disk.
+        Returns the removed ids.
+        """
+        removed = []
+        now = time.time()
+        usage = self.usage_bytes()
+        for mtime, job_id, size, held in self._evictable_jobs():
+            expired = now - mtime > self.max_age_seconds
+            if not expired and self._fits(usage, needed_bytes):
+                continue
+            if held:
+                # Abandoned lease (e.g. closed browser tab): stop holding it
+                with self._lock:
+                    self._held.discard(job_id)
+                self.finish_writes(job_id)
+            self._remove(job_id)
+            usage -= size
+            removed.append(job_id)
+        return removed
+
+
+_default_workspace = None
+
+
+def get_workspace():
+    """Process-wide workspace shared by all app sessions, so held jobs and reservations are shared too."""
+    global _default_workspace
+    if _default_workspace is None:
+        _default_workspace = Workspace()
+    return _default_workspace